@@ -1,4 +1,5 @@
 import datetime
+import json
 import logging
 import os
 import time
@@ -6,6 +7,7 @@ import requests
 
 from fail2ban_exporter.client import F2BClient
 from fail2ban_exporter.ipapi import IPAPI, HostData, QueryResult
+from fail2ban_exporter.iptrie import BanIndex, parse_thresholds
 from fail2ban_exporter.metrics import Metrics
 
 ATTACKER_DATA_REFRESH_INTERVAL = int(os.getenv("ATTACKER_DATA_REFRESH_INTERVAL", 432000))
@@ -18,6 +20,9 @@ LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 APP_HOST = os.getenv("APP_HOST", "0.0.0.0")
 APP_PORT = int(os.getenv("APP_PORT", 9090))
 WEBHOOK_URL = os.getenv("WEBHOOK_URL", None)
+CIDR_THRESHOLDS_V4 = os.getenv("CIDR_THRESHOLDS_V4")
+CIDR_THRESHOLDS_V6 = os.getenv("CIDR_THRESHOLDS_V6")
+CIDR_REPORT_PATH = os.getenv("CIDR_REPORT_PATH", None)
 
 formatter = logging.Formatter('%(asctime)s [%(levelname)s] %(message)s')
 console_handler = logging.StreamHandler()
@@ -28,9 +33,14 @@ logger.addHandler(console_handler)
 api = IPAPI(IPAPI_URL, IPAPI_BATCH_SIZE, IPAPI_USER_AGENT)
 metrics = Metrics()
 client = F2BClient(F2B_SOCKET_URI)
+ban_index = BanIndex(
+    parse_thresholds(CIDR_THRESHOLDS_V4) if CIDR_THRESHOLDS_V4 else None,
+    parse_thresholds(CIDR_THRESHOLDS_V6) if CIDR_THRESHOLDS_V6 else None,
+)
 
 known_jails = {}
 known_attackers = {}
+known_bans = set()
 
 def post(content: str):
     try:
@@ -56,6 +66,27 @@ def report_error():
     except Exception as e:
         logger.error("Failed to report error", exc_info=e)
 
+def update_ban_index(current_bans: set[str]):
+    for ip_address in known_bans - current_bans:
+        ban_index.remove(ip_address)
+        known_bans.remove(ip_address)
+    
+    for ip_address in current_bans - known_bans:
+        try:
+            ban_index.add(ip_address)
+            known_bans.add(ip_address)
+        except ValueError:
+            logger.debug(f"Skipping non-IP ban entry '{ip_address}'")
+    
+    report = ban_index.report()
+    metrics.update_ban_index(report)
+    if CIDR_REPORT_PATH:
+        # Write to a temporary file first so readers never see a partial report
+        temp_path = f"{CIDR_REPORT_PATH}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump(report, f, indent=2)
+        os.replace(temp_path, CIDR_REPORT_PATH)
+
 def perform_update():
     try:
         jail_names = client.get_jail_names()
@@ -90,6 +121,12 @@ def perform_update():
         
         # Add the contents of the jail
         current_attackers_set.update(known_jails[jail_name])
+    
+    try:
+        update_ban_index(current_attackers_set)
+    except Exception as e:
+        logger.error("Failed to update ban index", exc_info=e)
+        report_error()
         
     new_attackers_set = current_attackers_set - known_attackers_set
     forgiven_attackers = list(known_attackers_set - current_attackers_set)
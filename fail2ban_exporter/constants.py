@@ -8,4 +8,7 @@ IPAPI_DEFAULT_FIELDS = [
     "regionName", "city", "zip", "lat", "lon", "timezone",
     "isp" ,"org", "as", "mobile", "proxy", "hosting"
 ]
-IPAPI_USER_AGENT = f"iptracker/{__version__}"
\ No newline at end of file
+IPAPI_USER_AGENT = f"iptracker/{__version__}"
+
+CIDR_THRESHOLDS_V4 = "24:4,16:32"
+CIDR_THRESHOLDS_V6 = "64:4,48:16"
\ No newline at end of file
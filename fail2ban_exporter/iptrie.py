@@ -0,0 +1,256 @@
+import datetime
+import ipaddress
+from typing import Any, Generator, Optional, Self
+from fail2ban_exporter.constants import CIDR_THRESHOLDS_V4, CIDR_THRESHOLDS_V6
+
+def parse_thresholds(value: str) -> dict[int, int]:
+    # "24:4,16:32" -> {24: 4, 16: 32} (prefix length -> minimum bans)
+    thresholds = {}
+    for item in value.split(","):
+        item = item.strip()
+        if not item:
+            continue
+
+        prefix_length, _, min_bans = item.partition(":")
+        if not min_bans:
+            raise ValueError(f"Invalid threshold '{item}', expected <prefix length>:<minimum bans>")
+
+        thresholds[int(prefix_length.strip().lstrip("/"))] = int(min_bans)
+
+    return thresholds
+
+class _Node:
+    __slots__ = ("value", "length", "count", "children")
+
+    def __init__(self, value: int, length: int, count: int = 0) -> Self:
+        self.value = value
+        self.length = length
+        self.count = count
+        self.children: list[Optional[_Node]] = [None, None]
+
+class RadixTrie:
+    # Path-compressed binary trie over fixed-width addresses. Every stored address
+    # is a full-width leaf, inner nodes only exist where two branches diverge and
+    # carry the number of addresses below them.
+    def __init__(self, width: int) -> Self:
+        self._width = width
+        self._root = _Node(0, 0)
+
+    @property
+    def width(self) -> int:
+        return self._width
+
+    def __len__(self) -> int:
+        return self._root.count
+
+    def __contains__(self, address: int) -> bool:
+        node = self._root
+        while node.length < self._width:
+            node = node.children[self.__bit(address, node.length)]
+            if node is None or not self.__matches(node, address, node.length):
+                return False
+
+        return True
+
+    def __iter__(self) -> Generator[int, Any, None]:
+        yield from self.__leaves(self._root)
+
+    def __bit(self, address: int, position: int) -> int:
+        return (address >> (self._width - position - 1)) & 1
+
+    def __mask(self, address: int, length: int) -> int:
+        shift = self._width - length
+        return (address >> shift) << shift
+
+    def __matches(self, node: _Node, address: int, length: int) -> bool:
+        # Whether the first `length` bits of `address` agree with the node prefix
+        return self.__mask(address, length) == self.__mask(node.value, length)
+
+    def __leaves(self, node: _Node) -> Generator[int, Any, None]:
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if node.length == self._width:
+                yield node.value
+                continue
+
+            for child in reversed(node.children):
+                if child is not None:
+                    stack.append(child)
+
+    def add(self, address: int) -> bool:
+        if address in self:
+            return False
+
+        node = self._root
+        while True:
+            node.count += 1
+            bit = self.__bit(address, node.length)
+            child = node.children[bit]
+            if child is None:
+                node.children[bit] = _Node(address, self._width, 1)
+                return True
+
+            shift = self._width - child.length
+            diff = (address >> shift) ^ (child.value >> shift)
+            if diff == 0:
+                node = child
+                continue
+
+            # Split the edge at the first differing bit
+            common = child.length - diff.bit_length()
+            branch = _Node(self.__mask(address, common), common, child.count)
+            branch.children[self.__bit(child.value, common)] = child
+            node.children[bit] = branch
+            node = branch
+
+    def remove(self, address: int) -> bool:
+        if address not in self:
+            return False
+
+        path = [self._root]
+        while path[-1].length < self._width:
+            path[-1].count -= 1
+            path.append(path[-1].children[self.__bit(address, path[-1].length)])
+
+        leaf = path.pop()
+        parent = path.pop()
+        parent.children[self.__bit(address, parent.length)] = None
+        if parent is not self._root:
+            # The parent is left with a single branch, fold it into the grandparent
+            remaining = parent.children[0] or parent.children[1]
+            grandparent = path[-1]
+            grandparent.children[self.__bit(leaf.value, grandparent.length)] = remaining
+
+        return True
+
+    def find(self, network: int, length: int) -> Optional[_Node]:
+        # Topmost node whose addresses all fall inside network/length
+        node = self._root
+        while node.length < length:
+            node = node.children[self.__bit(network, node.length)]
+            if node is None or not self.__matches(node, network, min(node.length, length)):
+                return None
+
+        return node if node.count else None
+
+    def count(self, network: int, length: int) -> int:
+        node = self.find(network, length)
+        return node.count if node else 0
+
+    def query(self, network: int, length: int) -> Generator[int, Any, None]:
+        node = self.find(network, length)
+        if node:
+            yield from self.__leaves(node)
+
+    def prefix_counts(self, length: int) -> Generator[tuple[int, int], Any, None]:
+        # Every occupied network of the given prefix length with its address count
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node.length >= length:
+                if node.count:
+                    yield self.__mask(node.value, length), node.count
+                continue
+
+            for child in reversed(node.children):
+                if child is not None:
+                    stack.append(child)
+
+class BanIndex:
+    def __init__(self, thresholds_v4: Optional[dict[int, int]] = None, thresholds_v6: Optional[dict[int, int]] = None) -> Self:
+        self._tries = {
+            4: RadixTrie(32),
+            6: RadixTrie(128),
+        }
+        self._thresholds = {
+            4: thresholds_v4 or parse_thresholds(CIDR_THRESHOLDS_V4),
+            6: thresholds_v6 or parse_thresholds(CIDR_THRESHOLDS_V6),
+        }
+
+        for version, thresholds in self._thresholds.items():
+            width = self._tries[version].width
+            for prefix_length, min_bans in thresholds.items():
+                if not 0 < prefix_length < width:
+                    raise ValueError(f"Invalid IPv{version} prefix length: /{prefix_length}")
+                if min_bans < 2:
+                    raise ValueError(f"Invalid minimum ban count for /{prefix_length}: {min_bans}, at least 2 bans are required to consolidate")
+
+    def __len__(self) -> int:
+        return sum(len(trie) for trie in self._tries.values())
+
+    def __contains__(self, host: str) -> bool:
+        address = ipaddress.ip_address(host)
+        return int(address) in self._tries[address.version]
+
+    def add(self, host: str) -> bool:
+        address = ipaddress.ip_address(host)
+        return self._tries[address.version].add(int(address))
+
+    def remove(self, host: str) -> bool:
+        address = ipaddress.ip_address(host)
+        return self._tries[address.version].remove(int(address))
+
+    def count(self, cidr: str) -> int:
+        network = ipaddress.ip_network(cidr, strict=False)
+        return self._tries[network.version].count(int(network.network_address), network.prefixlen)
+
+    def query(self, cidr: str) -> list[str]:
+        network = ipaddress.ip_network(cidr, strict=False)
+        address_type = type(network.network_address)
+        trie = self._tries[network.version]
+        return [str(address_type(x)) for x in trie.query(int(network.network_address), network.prefixlen)]
+
+    def prefix_density(self, version: int) -> dict[int, int]:
+        # Number of distinct networks the bans occupy at each configured prefix length
+        trie = self._tries[version]
+        return {length: sum(1 for _ in trie.prefix_counts(length))
+                for length in sorted(self._thresholds[version])}
+
+    def suggest(self, version: int) -> list[tuple[ipaddress.IPv4Network | ipaddress.IPv6Network, int]]:
+        # Shortest qualifying prefixes first, networks nested inside an accepted one are skipped
+        trie = self._tries[version]
+        network_type = ipaddress.IPv4Network if version == 4 else ipaddress.IPv6Network
+        accepted: dict[int, set[int]] = {}
+        suggestions = []
+
+        for length, min_bans in sorted(self._thresholds[version].items()):
+            accepted[length] = set()
+            for network, count in trie.prefix_counts(length):
+                if count < min_bans:
+                    continue
+
+                if any(network >> (trie.width - x) << (trie.width - x) in accepted[x] for x in accepted if x < length):
+                    continue
+
+                accepted[length].add(network)
+                suggestions.append((network_type((network, length)), count))
+
+        return suggestions
+
+    def report(self) -> dict[str, Any]:
+        families = {}
+        for version, trie in self._tries.items():
+            suggestions = self.suggest(version)
+            covered = sum(count for _, count in suggestions)
+            families[f"ipv{version}"] = {
+                "banned": len(trie),
+                "entries_after_consolidation": len(trie) - covered + len(suggestions),
+                "prefixes": {
+                    str(length): {"networks": networks, "min_bans": self._thresholds[version][length]}
+                    for length, networks in self.prefix_density(version).items()
+                },
+                "suggestions": [
+                    {
+                        "cidr": str(network),
+                        "bans": count,
+                        "density": count / network.num_addresses,
+                    }
+                    for network, count in suggestions
+                ],
+            }
+
+        return {
+            "generated_at": datetime.datetime.now(datetime.UTC).isoformat(),
+            "families": families,
+        }
@@ -10,6 +10,11 @@ class Metrics:
         self._banned_total = Gauge("f2b_banned_total", "Total number of IP addresses that are banned", labelnames=["jail"])
         self._attackers = Gauge("f2b_current_attackers", "Currently known attackers", labelnames=["ip_address", "country", "region", "city", "isp", "lat", "lon", "mobile", "proxy", "hosting"])
         self._exporter_errors = Counter("f2b_exporter_errors", "The number of errors encountered since the exporter started")
+        self._banned_addresses = Gauge("f2b_banned_addresses", "The number of distinct banned IP addresses", labelnames=["family"])
+        self._ban_prefixes = Gauge("f2b_ban_prefixes", "The number of distinct networks occupied by banned IP addresses at a given prefix length", labelnames=["family", "prefix_length"])
+        self._ban_consolidated_entries = Gauge("f2b_ban_consolidated_entries", "The number of ban entries left after replacing addresses with the suggested CIDRs", labelnames=["family"])
+        self._ban_suggested_cidr = Gauge("f2b_ban_suggested_cidr", "The number of banned IP addresses inside a suggested CIDR", labelnames=["family", "cidr"])
+        self._ban_suggested_cidr_density = Gauge("f2b_ban_suggested_cidr_density", "The fraction of a suggested CIDR that is banned", labelnames=["family", "cidr"])
         self._known_attackers = {}
         
     def start_server(self, port: int, host: str = "0.0.0.0"):
@@ -51,5 +56,18 @@ class Metrics:
         self._attackers.remove(*labels)
         del self._known_attackers[ip_address]
         
+    def update_ban_index(self, report: dict):
+        self._ban_suggested_cidr.clear()
+        self._ban_suggested_cidr_density.clear()
+        for family, data in report["families"].items():
+            self._banned_addresses.labels(family).set(data["banned"])
+            self._ban_consolidated_entries.labels(family).set(data["entries_after_consolidation"])
+            for prefix_length, prefix in data["prefixes"].items():
+                self._ban_prefixes.labels(family, prefix_length).set(prefix["networks"])
+            
+            for suggestion in data["suggestions"]:
+                self._ban_suggested_cidr.labels(family, suggestion["cidr"]).set(suggestion["bans"])
+                self._ban_suggested_cidr_density.labels(family, suggestion["cidr"]).set(suggestion["density"])
+        
     def report_error(self):
         self._exporter_errors.inc()
\ No newline at end of file